@@ -10,10 +10,10 @@ import sys
 from pathlib import Path
 
 from .core import (
-    compact_wsl_vhd, 
-    get_default_distro, 
-    get_vhd_for_distro, 
-    is_windows, 
+    compact_wsl_vhd,
+    get_default_distro_and_vhd,
+    get_vhd_for_distro,
+    is_windows,
     is_admin,
     relaunch_elevated,
     log_message
@@ -44,9 +44,9 @@ Note: This tool must be run with administrator privileges on Windows.
     )
     
     parser.add_argument(
-        "--distro", 
-        default="Ubuntu",
-        help="WSL distro name (default: Ubuntu)"
+        "--distro",
+        default=None,
+        help="WSL distro name (default: the default WSL distro from the registry)"
     )
     
     parser.add_argument(
@@ -71,6 +71,26 @@ Note: This tool must be run with administrator privileges on Windows.
         action="store_true",
         help="Don't relaunch the distro after compaction"
     )
+
+    parser.add_argument(
+        "--skip-checks",
+        action="store_true",
+        help="Fast mode: skip the pre/post logout activity probes"
+    )
+
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Compact even if the VHD has not grown since the last run"
+    )
+
+    parser.add_argument(
+        "--min-trim-mb",
+        type=int,
+        default=256,
+        metavar="MB",
+        help="Skip compaction when fstrim trimmed less than this many MB (default: 256, 0 disables)"
+    )
     
     parser.add_argument(
         "--version",
@@ -91,14 +111,27 @@ Note: This tool must be run with administrator privileges on Windows.
         print("Please run as administrator or use --dry-run to simulate.", file=sys.stderr)
         return 1
     
-    # Determine VHD path
+    # Determine distro and VHD path; when no distro is given both come out of
+    # a single registry pass.
+    distro = args.distro
     vhd_path = args.vhd
+    if not distro:
+        try:
+            distro, default_vhd = get_default_distro_and_vhd()
+            log_message(f"Using default distro: {distro}")
+            if not vhd_path and default_vhd:
+                vhd_path = str(default_vhd)
+                log_message(f"Auto-detected VHD path: {vhd_path}")
+        except Exception as e:
+            print(f"ERROR: Could not determine the default distro: {e}", file=sys.stderr)
+            print("Please specify one with --distro", file=sys.stderr)
+            return 1
     if not vhd_path:
         try:
-            vhd_path = str(get_vhd_for_distro(args.distro))
+            vhd_path = str(get_vhd_for_distro(distro))
             log_message(f"Auto-detected VHD path: {vhd_path}")
         except Exception as e:
-            print(f"ERROR: Could not auto-detect VHD for distro '{args.distro}': {e}", file=sys.stderr)
+            print(f"ERROR: Could not auto-detect VHD for distro '{distro}': {e}", file=sys.stderr)
             print("Please specify the VHD path manually with --vhd", file=sys.stderr)
             return 1
     
@@ -111,11 +144,14 @@ Note: This tool must be run with administrator privileges on Windows.
     # Perform compaction
     try:
         result = compact_wsl_vhd(
-            distro=args.distro,
+            distro=distro,
             username=args.user,
             vhd_path=vhd_path,
             relaunch_after=not args.no_relaunch,
-            dry_run=args.dry_run
+            dry_run=args.dry_run,
+            skip_checks=args.skip_checks,
+            force=args.force,
+            min_trim_to_compact_mb=args.min_trim_mb
         )
         
         if result.success:
@@ -6,11 +6,23 @@ It can be used standalone for CLI operations or testing.
 """
 
 import os
+import re
 import sys
+import json
+import time
+import shlex
+import atexit
+import functools
 import subprocess
-import tempfile
 from pathlib import Path
-from datetime import datetime
+from typing import Callable
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson  # ~5x faster than stdlib json; optional
+except ImportError:
+    orjson = None
 
 # Global configuration
 APP_DIR = Path(os.environ.get("APPDATA", r".")) / "WSLCompact"
@@ -18,48 +30,99 @@ APP_DIR.mkdir(parents=True, exist_ok=True)
 LOG_DIR = APP_DIR / "logs"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 LOG_PATH = LOG_DIR / "latest.txt"
+CFG_PATH = APP_DIR / "config.json"
+VHD_CACHE_PATH = APP_DIR / "vhd_cache.json"
+COMPACT_STATE_PATH = APP_DIR / "compact_state.json"
+
+# A VHD within this factor of its size after the last compaction is treated
+# as "not grown" and the compact step is skipped.
+NO_GROWTH_FACTOR = 1.02
+
+# Matches the byte count in fstrim -v output, e.g.
+# "/: 1.2 GiB (1288490188 bytes) trimmed"
+_FSTRIM_BYTES = re.compile(r"\((\d+)\s+bytes\)\s+trimmed")
+
+# DiskPart lines worth surfacing; everything else (version banner,
+# copyright, "On computer:", blank lines) is dropped before emitting.
+_DISKPART_KEEP = re.compile(r"(percent|successfully|compacted|error|failed|attach|detach|select)", re.I)
+
+# shell32 entry points, bound once at import. Declaring argtypes/restype lets
+# ctypes skip its generic conversion-guessing path on every call.
+_IsUserAnAdmin = None
+_ShellExecuteW = None
+if os.name == "nt":
+    import ctypes
+    from ctypes import wintypes
+
+    _IsUserAnAdmin = ctypes.windll.shell32.IsUserAnAdmin
+    _IsUserAnAdmin.argtypes = []
+    _IsUserAnAdmin.restype = ctypes.c_int
+
+    _ShellExecuteW = ctypes.windll.shell32.ShellExecuteW
+    _ShellExecuteW.argtypes = [wintypes.HWND, wintypes.LPCWSTR, wintypes.LPCWSTR,
+                               wintypes.LPCWSTR, wintypes.LPCWSTR, ctypes.c_int]
+    _ShellExecuteW.restype = wintypes.HINSTANCE
+
 
-# Global dry-run flag
-DRY_RUN = False
+# Log file handle, opened lazily on first log_message call and kept open
+# (line-buffered) so each line is one write instead of an open/write/close.
+_log_fh = None
 
 
 def log_message(msg):
     """Log message to both console and log file."""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    global _log_fh
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
     log_entry = f"[{timestamp}] {msg}"
-    
+
     # Print to console
     print(log_entry)
-    
+
     # Write to log file
     try:
-        with open(LOG_PATH, "a", encoding="utf-8") as f:
-            f.write(log_entry + "\n")
+        if _log_fh is None:
+            _log_fh = open(LOG_PATH, "a", encoding="utf-8", buffering=1)
+            atexit.register(_log_fh.close)
+        _log_fh.write(log_entry + "\n")
     except Exception:
         pass  # Fail silently if logging fails
 
 
+@dataclass(slots=True, frozen=True)
+class CompactionContext:
+    """
+    Per-run settings threaded explicitly through the compaction helpers.
+
+    Replaces the old DRY_RUN module global, which made concurrent
+    compact_wsl_vhd calls with different dry_run values race.
+    """
+    dry_run: bool = False
+    log: Callable[[str], None] = log_message
+
+
+# Context used when a helper is called standalone without an explicit ctx.
+_DEFAULT_CTX = CompactionContext()
+
+
+@functools.lru_cache(maxsize=1)
 def is_windows():
     """Check if running on Windows."""
     return os.name == "nt"
 
 
+@functools.lru_cache(maxsize=1)
 def is_admin():
-    """Check if running with administrator privileges."""
-    if not is_windows():
-        return False
+    """Check if running with administrator privileges (cached: it cannot change within a process)."""
     try:
-        import ctypes
-        return ctypes.windll.shell32.IsUserAnAdmin() != 0
+        return bool(_IsUserAnAdmin and _IsUserAnAdmin())
     except Exception:
         return False
 
 
 def relaunch_elevated():
     """Relaunch current script with admin rights (for local runs)."""
-    import ctypes
     params = " ".join(f'"{a}"' for a in sys.argv)
-    ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, params, None, 1)
+    _ShellExecuteW(None, "runas", sys.executable, params, None, 1)
     sys.exit(0)
 
 
@@ -73,46 +136,203 @@ def wsl_root(distro, bash_cmd, check=True):
     return run(["wsl", "-d", distro, "-u", "root", "-e", "bash", "-lc", bash_cmd], check=check, capture=True)
 
 
+def prewarm_wsl(distro):
+    """
+    Kick off a trivial command in the distro so LxssManager boots the VM in
+    the background. Fire-and-forget: by the time the user clicks Run, the
+    3-10 s VM cold start has already been paid. Best-effort, never raises.
+    """
+    if not is_windows():
+        return
+    try:
+        subprocess.Popen(
+            ["wsl", "-d", distro, "-u", "root", "-e", "true"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+    except Exception:
+        pass
+
+
+def get_default_distro_and_vhd():
+    """
+    Resolve the default WSL distro and its VHD path in one registry pass.
+
+    Reads DefaultDistribution (a GUID) under HKCU\\...\\Lxss and that
+    subkey's DistributionName + BasePath together, avoiding both the wsl.exe
+    launches and a second registry walk for the VHD. Falls back to the first
+    registered distro when the DefaultDistribution value is missing.
+
+    Returns (distro, vhd_path); vhd_path is None when ext4.vhdx is missing.
+    """
+    if not is_windows():
+        raise RuntimeError("Distro detection only works on Windows")
+
+    import winreg
+
+    def _resolve(sk):
+        name, _ = winreg.QueryValueEx(sk, "DistributionName")
+        try:
+            base_path, _ = winreg.QueryValueEx(sk, "BasePath")
+            p = Path(base_path) / "ext4.vhdx"
+        except FileNotFoundError:
+            p = None
+        return name, (p if p is not None and p.exists() else None)
+
+    base = r"Software\Microsoft\Windows\CurrentVersion\Lxss"
+    with winreg.OpenKey(winreg.HKEY_CURRENT_USER, base) as k:
+        try:
+            guid, _ = winreg.QueryValueEx(k, "DefaultDistribution")
+            with winreg.OpenKey(k, guid) as sk:
+                return _resolve(sk)
+        except FileNotFoundError:
+            pass
+        # No default recorded: take the first registered distro.
+        n, _, _ = winreg.QueryInfoKey(k)
+        for i in range(n):
+            sub = winreg.EnumKey(k, i)
+            with winreg.OpenKey(k, sub) as sk:
+                try:
+                    return _resolve(sk)
+                except FileNotFoundError:
+                    continue
+    raise RuntimeError("No WSL distros found.")
+
+
 def get_default_distro():
-    """Get the default WSL distro."""
-    cp = run(["wsl", "-l", "-v"], capture=True)
-    for line in cp.stdout.splitlines():
-        if line.strip().startswith("*"):
-            parts = line.strip().split()
-            # "* Ubuntu-22.04   Running ..."
-            return parts[1]
-    cp2 = run(["wsl", "-l", "-q"], capture=True)
-    names = [l.strip() for l in cp2.stdout.splitlines() if l.strip()]
-    if not names:
-        raise RuntimeError("No WSL distros found.")
-    return names[0]
-
-
-def get_vhd_for_distro(distro):
-    """Get the VHD path for a specific distro from the Windows registry."""
+    """Get the default WSL distro name from the registry."""
+    return get_default_distro_and_vhd()[0]
+
+
+def _write_json_atomic(path: Path, obj):
+    """
+    Write obj as JSON to path via a temp file + os.replace so a crash
+    mid-write never leaves a truncated file. Skips the write entirely when
+    the serialized content is unchanged. Fails silently.
+    """
+    try:
+        if orjson is not None:
+            new = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        else:
+            new = json.dumps(obj, indent=2).encode("utf-8")
+        try:
+            if path.read_bytes() == new:
+                return
+        except OSError:
+            pass
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(new)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+def _load_vhd_cache():
+    """Load the distro -> VHD path cache from disk. Returns {} on any error."""
+    try:
+        if orjson is not None:
+            return orjson.loads(VHD_CACHE_PATH.read_bytes())
+        return json.loads(VHD_CACHE_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def _save_vhd_cache(cache):
+    """Write the distro -> VHD path cache to disk. Fails silently."""
+    _write_json_atomic(VHD_CACHE_PATH, cache)
+
+
+def _load_compact_state():
+    """Load the per-VHD post-compaction size state. Returns {} on any error."""
+    try:
+        if orjson is not None:
+            return orjson.loads(COMPACT_STATE_PATH.read_bytes())
+        return json.loads(COMPACT_STATE_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def _record_compacted_size(vhd_path: Path):
+    """Remember the VHD size after a successful compaction. Fails silently."""
+    try:
+        state = _load_compact_state()
+        state[str(vhd_path)] = {"size": vhd_path.stat().st_size, "compacted_at": time.time()}
+        _write_json_atomic(COMPACT_STATE_PATH, state)
+    except OSError:
+        pass
+
+
+def _validate_vhdx(path: Path):
+    """
+    Fail fast if path is not actually a VHDX (signature 'vhdxfile' at offset
+    0). Reading 8 bytes takes <1 ms versus the minutes DiskPart can spend
+    attaching a bogus file before erroring out.
+    """
+    with open(path, "rb") as f:
+        header = f.read(8)
+    if header != b"vhdxfile":
+        raise ValueError(f"Not a VHDX file: {path}")
+
+
+def _trimmed_bytes(trim_lines):
+    """Total bytes reported trimmed by fstrim, summed across mount points."""
+    total = 0
+    for line in trim_lines:
+        m = _FSTRIM_BYTES.search(line)
+        if m:
+            total += int(m.group(1))
+    return total
+
+
+def _compacted_recently(vhd_path: Path):
+    """True if the VHD has not grown since the last recorded compaction."""
+    try:
+        last = _load_compact_state().get(str(vhd_path), {}).get("size")
+        return bool(last) and vhd_path.stat().st_size <= last * NO_GROWTH_FACTOR
+    except OSError:
+        return False
+
+
+def get_vhd_for_distro(distro, use_cache=True):
+    """
+    Get the VHD path for a specific distro.
+
+    Results are cached in VHD_CACHE_PATH so repeat lookups avoid the registry
+    walk entirely; the registry is only re-scanned when the cached path no
+    longer exists or use_cache is False (e.g. an explicit re-detect).
+    """
     if not is_windows():
         raise RuntimeError("VHD detection only works on Windows")
-    
+
+    cache = _load_vhd_cache()
+    if use_cache:
+        entry = cache.get(distro)
+        if entry:
+            p = Path(entry.get("vhd", ""))
+            if p.exists():
+                return p
+
     import winreg
     base = r"Software\Microsoft\Windows\CurrentVersion\Lxss"
     with winreg.OpenKey(winreg.HKEY_CURRENT_USER, base) as k:
-        i = 0
-        while True:
-            try:
-                sub = winreg.EnumKey(k, i)
-                i += 1
-            except OSError:
-                break
+        # QueryInfoKey gives the subkey count up front, so the scan is a plain
+        # bounded loop; BasePath is only queried for the matching distro.
+        n, _, _ = winreg.QueryInfoKey(k)
+        for i in range(n):
+            sub = winreg.EnumKey(k, i)
             with winreg.OpenKey(k, sub) as sk:
                 try:
                     name, _ = winreg.QueryValueEx(sk, "DistributionName")
-                    if name == distro:
-                        base_path, _ = winreg.QueryValueEx(sk, "BasePath")
-                        p = Path(base_path) / "ext4.vhdx"
-                        if p.exists():
-                            return p
                 except FileNotFoundError:
                     continue
+                if name != distro:
+                    continue
+                base_path, _ = winreg.QueryValueEx(sk, "BasePath")
+                p = Path(base_path) / "ext4.vhdx"
+                if p.exists():
+                    cache[distro] = {"vhd": str(p), "verified_at": time.time()}
+                    _save_vhd_cache(cache)
+                    return p
+                break
     raise FileNotFoundError(f"VHD not found for distro {distro}")
 
 
@@ -126,90 +346,237 @@ def user_active(distro, username):
     return cp.stdout.strip().endswith("0")
 
 
-def logout_user(distro, username):
+def check_logout_user(distro, username, do_trim=False, probe=True, ctx: CompactionContext = None):
+    """
+    Probe for user activity, force-logout, re-probe and (optionally) fstrim
+    in a single wsl.exe invocation (one VM round-trip instead of four).
+
+    With probe=False the activity checks are dropped entirely (fast mode) and
+    only the kill (plus optional fstrim) runs.
+
+    Returns (was_active, still_active, trim_lines) where trim_lines is the
+    fstrim output (empty when do_trim is False); the two booleans are always
+    False when probe is False.
+    """
+    ctx = ctx or _DEFAULT_CTX
+    if ctx.dry_run:
+        ctx.log(f"[DRY-RUN] Would check activity and kill all processes for user {username} in distro {distro}")
+        if do_trim:
+            ctx.log(f"[DRY-RUN] Would run fstrim -av in distro {distro}")
+        return False, False, []
+    # Quote once so a username containing spaces or shell metacharacters
+    # can't break (or inject into) the bash -lc string.
+    u = shlex.quote(username)
+    if probe:
+        cmd = (
+            f'pre=$(id -u {u} >/dev/null 2>&1 && pgrep -u {u} >/dev/null 2>&1 && echo 1 || echo 0); '
+            f'pkill -KILL -u {u} 2>/dev/null || true; '
+            f'sleep 0.2; '
+            f'post=$(pgrep -u {u} >/dev/null 2>&1 && echo 1 || echo 0); '
+            f'printf "PRE=%s\\nPOST=%s\\n" "$pre" "$post"'
+        )
+    else:
+        cmd = f'pkill -KILL -u {u} 2>/dev/null || true'
+    if do_trim:
+        cmd += "; fstrim -av 2>&1 | sed 's/^/FSTRIM: /' || true"
+    cp = wsl_root(distro, cmd, check=False)
+    pre = post = False
+    trim_lines = []
+    for line in cp.stdout.splitlines():
+        if line.startswith("PRE="):
+            pre = line.strip().endswith("1")
+        elif line.startswith("POST="):
+            post = line.strip().endswith("1")
+        elif line.startswith("FSTRIM: "):
+            trim_lines.append(line[len("FSTRIM: "):])
+    return pre, post, trim_lines
+
+
+def logout_user(distro, username, ctx: CompactionContext = None):
     """
     Force logout by killing all processes of the user. Best-effort and safe to run even if no procs.
     """
-    if DRY_RUN:
-        log_message(f"[DRY-RUN] Would kill all processes for user {username} in distro {distro}")
+    ctx = ctx or _DEFAULT_CTX
+    if ctx.dry_run:
+        ctx.log(f"[DRY-RUN] Would kill all processes for user {username} in distro {distro}")
         return
     wsl_root(distro, f'if id -u {username} >/dev/null 2>&1; then pkill -KILL -u {username} || true; fi', check=False)
 
 
-def terminate_wsl(distro):
-    """Terminate the WSL distro and shutdown WSL."""
-    if DRY_RUN:
-        log_message(f"[DRY-RUN] Would terminate WSL distro {distro} and shutdown WSL")
+def terminate_wsl(distro, ctx: CompactionContext = None):
+    """Shut down WSL (stops all distros and the VM, so no per-distro terminate is needed)."""
+    ctx = ctx or _DEFAULT_CTX
+    if ctx.dry_run:
+        ctx.log(f"[DRY-RUN] Would shutdown WSL (stopping distro {distro})")
         return
-    run(["wsl", "--terminate", distro], check=False)
     run(["wsl", "--shutdown"], check=False)
 
 
-def run_diskpart_compact(vhd_path: Path):
-    """Run DiskPart to compact the VHD file."""
+def run_optimize_vhd(vhd_path: Path, ctx: CompactionContext = None):
+    """
+    Compact the VHD with Optimize-VHD (Hyper-V PowerShell module) when
+    available. Availability check and the optimize itself run in a single
+    powershell.exe invocation so we only pay PowerShell startup once.
+
+    Returns True if Optimize-VHD ran, False if the cmdlet is unavailable
+    (exit code 2) and the caller should fall back to DiskPart.
+    """
+    ctx = ctx or _DEFAULT_CTX
+    if ctx.dry_run:
+        ctx.log(f"[DRY-RUN] Would try Optimize-VHD on {vhd_path} (DiskPart fallback if unavailable)")
+        return False
+
+    # Hyper-V cmdlet errors are non-terminating by default, so without
+    # ErrorActionPreference=Stop a failed Mount/Optimize would fall through
+    # to exit 0 and the DiskPart fallback would never trigger.
+    ps_script = (
+        "$ErrorActionPreference = 'Stop'; "
+        "if (Get-Command Optimize-VHD -ErrorAction SilentlyContinue) { "
+        "try { "
+        f"Mount-VHD -Path '{vhd_path}' -ReadOnly; "
+        f"try {{ Optimize-VHD -Path '{vhd_path}' -Mode Full }} "
+        f"finally {{ Dismount-VHD -Path '{vhd_path}' }} "
+        "} catch { Write-Output $_; exit 1 }; "
+        "exit 0 } else { exit 2 }"
+    )
+    proc = subprocess.Popen(
+        ["powershell.exe", "-NoProfile", "-NonInteractive", "-Command", ps_script],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, bufsize=1,
+    )
+    for line in proc.stdout:
+        ctx.log(line.rstrip())
+    rc = proc.wait()
+    if rc == 2:
+        return False
+    if rc != 0:
+        raise subprocess.CalledProcessError(rc, proc.args)
+    return True
+
+
+def run_diskpart_compact(vhd_path: Path, ctx: CompactionContext = None):
+    """
+    Run DiskPart to compact the VHD file, streaming each output line to
+    ctx.log as it arrives instead of buffering the full transcript until
+    DiskPart exits.
+    """
     script = f"""select vdisk file="{vhd_path}"
 attach vdisk readonly
 compact vdisk
 detach vdisk
 exit
 """
-    if DRY_RUN:
-        log_message(f"[DRY-RUN] Would run DiskPart compact on {vhd_path}")
-        log_message(f"[DRY-RUN] DiskPart script would be:\n{script}")
-        return "[DRY-RUN] DiskPart compact simulation completed"
-    
-    with tempfile.NamedTemporaryFile("w", delete=False, suffix=".txt") as tf:
-        tf.write(script)
-        p = tf.name
-    try:
-        cp = run(["diskpart.exe", "/s", p], check=True, capture=True)
-        return cp.stdout
-    finally:
+    ctx = ctx or _DEFAULT_CTX
+    if ctx.dry_run:
+        ctx.log(f"[DRY-RUN] Would run DiskPart compact on {vhd_path}")
+        ctx.log(f"[DRY-RUN] DiskPart script would be:\n{script}")
+        # scripts/test-compact.ps1 greps for this exact completion line.
+        ctx.log("[DRY-RUN] DiskPart compact simulation completed")
+        return
+    if not is_windows():
+        raise RuntimeError("DiskPart compaction only works on Windows")
+
+    # 'wsl --shutdown' can return before the VHD is fully released on some
+    # Windows builds; retrying with backoff beats a fixed sleep on every run.
+    delays = (0, 0.5, 1.0, 2.0)
+    for delay in delays:
+        if delay:
+            time.sleep(delay)
         try:
-            os.remove(p)
-        except OSError:
-            pass
-
-
-def relaunch_distro(distro, username):
+            return _run_diskpart(script, ctx.log)
+        except subprocess.CalledProcessError as e:
+            if "in use" not in (e.output or "").lower() or delay == delays[-1]:
+                raise
+            ctx.log("VHD still in use; retrying DiskPart…")
+
+
+def _run_diskpart(script, on_line):
+    """Single DiskPart attempt: feed the script over stdin, stream output."""
+    # diskpart.exe accepts its script on stdin when started without /s, so no
+    # script file needs to exist on disk at all.
+    proc = subprocess.Popen(
+        ["diskpart.exe"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, bufsize=1,
+    )
+    proc.stdin.write(script)
+    proc.stdin.close()
+    raw_lines = []
+    for line in proc.stdout:
+        line = line.rstrip()
+        raw_lines.append(line)
+        if not line.strip() or not _DISKPART_KEEP.search(line):
+            continue
+        on_line(line)
+    rc = proc.wait()
+    if rc != 0:
+        raise subprocess.CalledProcessError(rc, proc.args, output="\n".join(raw_lines))
+
+
+def relaunch_distro(distro, username, ctx: CompactionContext = None):
     """Relaunch the WSL distro for the specified user."""
     # Non-interactive background start so the distro is "up" for that user.
-    if DRY_RUN:
-        log_message(f"[DRY-RUN] Would relaunch WSL distro {distro} for user {username}")
+    ctx = ctx or _DEFAULT_CTX
+    if ctx.dry_run:
+        ctx.log(f"[DRY-RUN] Would relaunch WSL distro {distro} for user {username}")
         return
     subprocess.Popen(["wsl", "-d", distro, "-u", username])
 
 
+# Single background thread for post-compaction relaunches, created lazily so
+# compact_wsl_vhd can return without waiting for the Popen to stabilize.
+_relaunch_executor = None
+
+
+def _get_relaunch_executor():
+    global _relaunch_executor
+    if _relaunch_executor is None:
+        _relaunch_executor = ThreadPoolExecutor(max_workers=1)
+    return _relaunch_executor
+
+
 class CompactionResult:
     """Result of a compaction operation."""
-    def __init__(self, success: bool, message: str, log_entries: list = None):
+    def __init__(self, success: bool, message: str, log_entries: list = None, relaunch_future=None):
         self.success = success
         self.message = message
         self.log_entries = log_entries or []
+        # Future for the background relaunch; callers that care can join it.
+        self.relaunch_future = relaunch_future
 
 
-def compact_wsl_vhd(distro: str, username: str, vhd_path: str, relaunch_after: bool = True, dry_run: bool = False) -> CompactionResult:
+def compact_wsl_vhd(distro: str, username: str, vhd_path: str, relaunch_after: bool = True, dry_run: bool = False, skip_checks: bool = False, force: bool = False, min_trim_to_compact_mb: int = 256, on_log=None) -> CompactionResult:
     """
     Core compaction logic - extracted from the Worker.run() method.
-    
+
     Args:
         distro: WSL distro name (e.g., "Ubuntu")
         username: Username to logout (e.g., "ubuntu")
         vhd_path: Path to the VHDX file to compact
         relaunch_after: Whether to relaunch the distro after compaction
         dry_run: Whether to simulate operations without actually performing them
-    
+        skip_checks: Skip the pre/post logout activity probes (fast mode)
+        force: Compact even when the VHD has not grown since the last run
+        min_trim_to_compact_mb: Skip the compact when fstrim reclaimed less
+            than this many MB (0 disables the threshold)
+        on_log: Optional callback receiving each log line as it is produced.
+            When given, lines stream to it directly and the result's
+            log_entries list stays empty (no O(N) buffering).
+
     Returns:
         CompactionResult with success status and messages
     """
-    global DRY_RUN
-    DRY_RUN = dry_run
-    
     log_entries = []
-    
+
     def emit_log(msg):
         log_message(msg)
-        log_entries.append(msg)
+        if on_log is not None:
+            on_log(msg)
+        else:
+            log_entries.append(msg)
+
+    ctx = CompactionContext(dry_run=dry_run, log=emit_log)
     
     try:
         vhd_path_obj = Path(vhd_path)
@@ -223,52 +590,93 @@ def compact_wsl_vhd(distro: str, username: str, vhd_path: str, relaunch_after: b
                 emit_log(f"Warning: VHD file not found (dry-run, continuing): {vhd_path_obj}")
             else:
                 return CompactionResult(False, f"VHD file not found: {vhd_path_obj}", log_entries)
-        
-        # 1) Detect activity
-        emit_log("Checking for active user processes…")
-        active = False
-        try:
-            active = user_active(distro, username)
-        except Exception as e:
-            emit_log(f"Warning: activity check failed ({e}); continuing.")
-        
-        # 2) Log out (force)
-        if active:
-            emit_log("User appears active; logging out (killing all processes)…")
         else:
-            emit_log("No active processes detected for user; proceeding to shutdown.")
-        
-        try:
-            logout_user(distro, username)
-        except Exception as e:
-            emit_log(f"Warning: logout attempt failed ({e}); continuing.")
+            # Cheap sanity check before shutting anything down: a wrong path
+            # (old .vhd, unrelated file) would otherwise only fail minutes
+            # later inside DiskPart.
+            try:
+                _validate_vhdx(vhd_path_obj)
+            except ValueError as e:
+                emit_log(str(e))
+                return CompactionResult(False, f"{e} — check the VHDX path.", log_entries)
+            except OSError as e:
+                emit_log(f"Warning: could not read VHD header ({e}); continuing.")
         
-        # Re-check
+        # 1+2) Detect activity, log out (force), verify and fstrim in one wsl.exe call
+        trim_lines = []
         try:
-            still_active = user_active(distro, username)
-            emit_log("Logout verification: " + ("FAILED (still active)" if still_active else "OK"))
+            if skip_checks:
+                emit_log("Fast mode: skipping activity probes; logging out user…")
+                _, _, trim_lines = check_logout_user(distro, username, do_trim=True, probe=False, ctx=ctx)
+            else:
+                emit_log("Checking for active user processes…")
+                active, still_active, trim_lines = check_logout_user(distro, username, do_trim=True, ctx=ctx)
+                if active:
+                    emit_log("User appears active; logging out (killing all processes)…")
+                else:
+                    emit_log("No active processes detected for user; proceeding to shutdown.")
+                emit_log("Logout verification: " + ("FAILED (still active)" if still_active else "OK"))
+            for trim_line in trim_lines:
+                emit_log(f"fstrim: {trim_line}")
         except Exception as e:
-            emit_log(f"Warning: could not re-verify logout ({e}).")
-        
-        # 3) Clean shutdown
-        emit_log("Stopping WSL…")
-        terminate_wsl(distro)
+            emit_log(f"Warning: activity check/logout failed ({e}); continuing.")
         
-        # 4) Compact
-        emit_log("Compacting VHD (DiskPart)…")
-        out = run_diskpart_compact(vhd_path_obj)
-        emit_log(out if out else "DiskPart finished.")
-        
-        # 5) Optional relaunch
+        # fstrim is what actually surfaces freeable space; if it barely
+        # trimmed anything, DiskPart's scan would be pure I/O waste. A large
+        # trim, on the other hand, invalidates the no-growth heuristic below:
+        # deleting files never shrinks the VHD, so an unchanged size can still
+        # hide gigabytes of reclaimable space. Either skip only bypasses the
+        # shutdown+compact steps - the user was already logged out above, so
+        # we still fall through to the relaunch.
+        skip_message = None
+        if not force and not dry_run:
+            if trim_lines:
+                trimmed = _trimmed_bytes(trim_lines)
+                if trimmed < min_trim_to_compact_mb * 1024 * 1024:
+                    emit_log(f"Only {trimmed // (1024 * 1024)} MB trimmed "
+                             f"(threshold {min_trim_to_compact_mb} MB); skipping VHD compaction.")
+                    skip_message = "Compaction skipped: too little space trimmed."
+            elif _compacted_recently(vhd_path_obj):
+                # No trim data to go on: fall back to skipping when the VHD
+                # hasn't grown since the last compaction.
+                emit_log("VHD has not grown since last compaction; skipping compact (use force to override).")
+                skip_message = "Compaction skipped: no growth since last run."
+
+        if skip_message is None:
+            # 3) Clean shutdown
+            emit_log("Shutting down WSL…")
+            terminate_wsl(distro, ctx)
+
+            # 4) Compact: prefer Optimize-VHD, fall back to DiskPart
+            emit_log("Compacting VHD…")
+            optimized = False
+            try:
+                optimized = run_optimize_vhd(vhd_path_obj, ctx)
+            except Exception as e:
+                emit_log(f"Warning: Optimize-VHD failed ({e}); falling back to DiskPart.")
+            if optimized:
+                emit_log("Optimize-VHD finished.")
+            else:
+                emit_log("Compacting via DiskPart…")
+                run_diskpart_compact(vhd_path_obj, ctx)
+                emit_log("DiskPart finished.")
+            if not dry_run:
+                _record_compacted_size(vhd_path_obj)
+
+        # 5) Optional relaunch, handed to a background thread so we can
+        # report completion without waiting on the wsl launch. On a skipped
+        # compact WSL was never shut down, but the user's session was killed
+        # and still needs restoring.
+        relaunch_future = None
         if relaunch_after:
             emit_log("Relaunching distro…")
             try:
-                relaunch_distro(distro, username)
+                relaunch_future = _get_relaunch_executor().submit(relaunch_distro, distro, username, ctx)
                 emit_log("Relaunch requested.")
             except Exception as e:
                 emit_log(f"Warning: relaunch failed ({e})")
-        
-        return CompactionResult(True, "Compaction completed successfully.", log_entries)
+
+        return CompactionResult(True, skip_message or "Compaction completed successfully.", log_entries, relaunch_future)
         
     except Exception as e:
         error_msg = f"Error: {e}"
@@ -0,0 +1,272 @@
+"""
+WSL Compact GUI - PySide6 interface for WSL2 VHDX compaction
+
+This module holds everything that touches Qt so that the CLI and the app.py
+launcher never pay the PySide6 import cost (~hundreds of ms) for --help,
+--version or dry-run argument parsing.
+"""
+
+import sys
+import json
+from pathlib import Path
+
+from PySide6.QtWidgets import (
+    QApplication, QWidget, QVBoxLayout, QFormLayout, QLineEdit,
+    QPushButton, QFileDialog, QTextEdit, QCheckBox, QMessageBox
+)
+from PySide6.QtCore import Qt, QObject, QRunnable, QSettings, QThreadPool, QTimer, Signal
+
+from .core import (
+    compact_wsl_vhd, get_vhd_for_distro, is_windows, is_admin,
+    relaunch_elevated, log_message, prewarm_wsl, APP_DIR, CFG_PATH
+)
+
+# ---------- worker ----------
+class WorkerSignals(QObject):
+    # QRunnable is not a QObject, so its signals live on this helper.
+    log = Signal(str)
+    done = Signal(str, bool)  # message, ok?
+
+
+class Worker(QRunnable):
+    """Compaction job submitted to the shared QThreadPool.
+
+    Pool threads are reused across runs, avoiding the cost of creating and
+    tearing down a fresh QThread for every Run click.
+    """
+
+    def __init__(self, distro, username, vhd_path, relaunch_after, skip_checks=False, force=False, dry_run=False):
+        super().__init__()
+        self.signals = WorkerSignals()
+        self.distro = distro
+        self.username = username
+        self.vhd_path = vhd_path
+        self.relaunch_after = relaunch_after
+        self.skip_checks = skip_checks
+        self.force = force
+        self.dry_run = dry_run
+
+    def run(self):
+        """Run the compaction using the core module."""
+        # Use the core compaction function; log lines stream straight to the
+        # GUI signal instead of being buffered in the result.
+        result = compact_wsl_vhd(
+            distro=self.distro,
+            username=self.username,
+            vhd_path=self.vhd_path,
+            relaunch_after=self.relaunch_after,
+            dry_run=self.dry_run,
+            skip_checks=self.skip_checks,
+            force=self.force,
+            on_log=self.signals.log.emit
+        )
+
+        # Emit final result
+        self.signals.done.emit(result.message, result.success)
+
+# ---------- UI ----------
+class MainWin(QWidget):
+    def __init__(self, dry_run=False):
+        super().__init__()
+        self.dry_run = dry_run
+        self.setWindowTitle("WSL Compact (PySide6)")
+
+        form = QFormLayout()
+        self.distro = QLineEdit("Ubuntu")
+        self.username = QLineEdit("ubuntu")
+        self.vhd = QLineEdit("")
+        self.relaunch = QCheckBox("Relaunch distro after compaction")
+        self.relaunch.setChecked(True)
+        self.skip_checks = QCheckBox("Fast mode (skip activity probes)")
+        self.force = QCheckBox("Force compact (even if VHD has not grown)")
+
+        browse = QPushButton("Browse…")
+        browse.clicked.connect(self.pick_vhd)
+
+        detect = QPushButton("Detect VHD")
+        detect.clicked.connect(self.detect_vhd)
+
+        form.addRow("Distro:", self.distro)
+        form.addRow("Username:", self.username)
+        # VHD field + buttons stacked
+        vhd_row = QWidget(); vbox = QVBoxLayout(vhd_row); vbox.setContentsMargins(0,0,0,0)
+        vbox.addWidget(self.vhd)
+        # Button row for Browse and Detect
+        btn_row = QWidget(); btn_layout = QVBoxLayout(btn_row); btn_layout.setContentsMargins(0,0,0,0)
+        btn_layout.addWidget(browse); btn_layout.addWidget(detect)
+        vbox.addWidget(btn_row)
+        form.addRow("VHDX:", vhd_row)
+        form.addRow("", self.relaunch)
+        form.addRow("", self.skip_checks)
+        form.addRow("", self.force)
+
+        self.runbtn = QPushButton("Run")
+        self.runbtn.clicked.connect(self.run_clicked)
+        self.log = QTextEdit(); self.log.setReadOnly(True)
+
+        # Coalesce log lines: each QTextEdit.append re-lays-out the widget on
+        # the UI thread, so buffer worker output and flush in 50 ms batches.
+        self._log_buf = []
+        self._log_timer = QTimer(self)
+        self._log_timer.setInterval(50)
+        self._log_timer.timeout.connect(self._flush_log)
+        self._log_timer.start()
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(form)
+        layout.addWidget(self.runbtn)
+        layout.addWidget(self.log)
+
+        # Load config (QSettings batches writes in memory and flushes lazily,
+        # unlike the old synchronous config.json rewrite on every save)
+        self.settings = QSettings("WSLCompact", "WSLCompact")
+        self._migrate_json_config()
+        self.distro.setText(self.settings.value("distro", "Ubuntu"))
+        self.username.setText(self.settings.value("username", "ubuntu"))
+        self.vhd.setText(self.settings.value("vhd", ""))
+        self.relaunch.setChecked(self.settings.value("relaunch", True, type=bool))
+        self.skip_checks.setChecked(self.settings.value("skip_checks", False, type=bool))
+        self.force.setChecked(self.settings.value("force", False, type=bool))
+
+        # Restore window geometry if saved
+        self.resize(self.settings.value("window/width", 600, type=int),
+                    self.settings.value("window/height", 440, type=int))
+        if self.settings.contains("window/x") and self.settings.contains("window/y"):
+            self.move(self.settings.value("window/x", 0, type=int),
+                      self.settings.value("window/y", 0, type=int))
+
+        # Best-effort auto-detect VHD on first run
+        if not self.vhd.text() and is_windows():
+            try:
+                self.vhd.setText(str(get_vhd_for_distro(self.distro.text().strip() or "Ubuntu")))
+            except: pass
+
+        # Pre-warm the WSL VM while the user is still looking at the window,
+        # hiding the 3-10 s cold start behind think-time before Run is clicked.
+        if self.settings.value("prewarm_vm", True, type=bool):
+            prewarm_wsl(self.distro.text().strip() or "Ubuntu")
+
+    def _migrate_json_config(self):
+        """One-shot import of the legacy config.json into QSettings."""
+        if not CFG_PATH.exists():
+            return
+        try:
+            cfg = json.loads(CFG_PATH.read_text())
+            self.settings.setValue("distro", cfg.get("distro", "Ubuntu"))
+            self.settings.setValue("username", cfg.get("username", "ubuntu"))
+            self.settings.setValue("vhd", cfg.get("vhd", ""))
+            self.settings.setValue("relaunch", bool(cfg.get("relaunch", True)))
+            geom = cfg.get("window_geometry", {})
+            for key in ("x", "y", "width", "height"):
+                if key in geom:
+                    self.settings.setValue(f"window/{key}", geom[key])
+            CFG_PATH.unlink()
+        except Exception:
+            pass
+
+    def pick_vhd(self):
+        p, _ = QFileDialog.getOpenFileName(self, "Select ext4.vhdx", str(Path.home()), "VHDX (*.vhdx)")
+        if p: self.vhd.setText(p)
+
+    def detect_vhd(self):
+        """Auto-detect VHD path for the current distro."""
+        distro = self.distro.text().strip() or "Ubuntu"
+
+        if not is_windows():
+            QMessageBox.warning(self, "Warning", "VHD detection only works on Windows.")
+            return
+
+        try:
+            # Explicit re-detect: bypass the on-disk cache and rescan the registry.
+            vhd_path = get_vhd_for_distro(distro, use_cache=False)
+            self.vhd.setText(str(vhd_path))
+            QMessageBox.information(self, "Success", f"VHD detected: {vhd_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not detect VHD for distro '{distro}': {e}")
+
+    def save_config(self):
+        """Save current configuration including window geometry."""
+        self.settings.setValue("distro", self.distro.text().strip() or "Ubuntu")
+        self.settings.setValue("username", self.username.text().strip() or "ubuntu")
+        self.settings.setValue("vhd", self.vhd.text().strip())
+        self.settings.setValue("relaunch", self.relaunch.isChecked())
+        self.settings.setValue("skip_checks", self.skip_checks.isChecked())
+        self.settings.setValue("force", self.force.isChecked())
+        self.settings.setValue("window/x", self.x())
+        self.settings.setValue("window/y", self.y())
+        self.settings.setValue("window/width", self.width())
+        self.settings.setValue("window/height", self.height())
+
+    def closeEvent(self, event):
+        """Called when window is closed - save config."""
+        self.save_config()
+        event.accept()
+
+    def run_clicked(self):
+        # Save config before running
+        self.save_config()
+
+        if not is_windows():
+            QMessageBox.critical(self, "Error", "This tool must run on Windows.")
+            return
+
+        # If not admin (e.g., running from source), relaunch elevated
+        if not is_admin():
+            relaunch_elevated()
+
+        distro = self.distro.text().strip() or "Ubuntu"
+        username = self.username.text().strip() or "ubuntu"
+        vhd = self.vhd.text().strip()
+
+        if not vhd:
+            try:
+                vhd = str(get_vhd_for_distro(distro))
+                self.vhd.setText(vhd)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"VHD not found: {e}")
+                return
+
+        self.runbtn.setEnabled(False)
+        # Keep a reference on self so the signals QObject isn't GC'd while
+        # the pool thread is still running.
+        self.worker = Worker(distro, username, vhd, self.relaunch.isChecked(),
+                             skip_checks=self.skip_checks.isChecked(),
+                             force=self.force.isChecked(),
+                             dry_run=self.dry_run)
+        self.worker.signals.log.connect(self._append_log)
+        self.worker.signals.done.connect(self.finish)
+        QThreadPool.globalInstance().start(self.worker)
+
+    def _append_log(self, s):
+        self._log_buf.append(s)
+
+    def _flush_log(self):
+        if self._log_buf:
+            self.log.append("\n".join(self._log_buf))
+            self._log_buf.clear()
+
+    def finish(self, msg, ok):
+        self._flush_log()
+        self.log.append(msg)
+        if not ok:
+            QMessageBox.critical(self, "Result", msg)
+        else:
+            QMessageBox.information(self, "Result", msg)
+        self.runbtn.setEnabled(True)
+
+
+def main(dry_run=False):
+    """Start the GUI event loop. Returns the Qt exit code."""
+    if dry_run:
+        log_message("[DRY-RUN MODE] No actual changes will be made")
+    else:
+        log_message("WSL Compact GUI started")
+
+    app = QApplication(sys.argv)
+    w = MainWin(dry_run=dry_run); w.show()
+
+    # Add dry-run indicator to window title if enabled
+    if dry_run:
+        w.setWindowTitle("WSL Compact (PySide6) - DRY RUN MODE")
+
+    return app.exec()